@@ -17,8 +17,27 @@
 import googlecl
 import logging
 import re
+import threading
 import urllib
+import urlparse
 import time
+import Queue
+
+try:
+  parse_qs = urlparse.parse_qs
+  parse_qsl = urlparse.parse_qsl
+except AttributeError:
+  # parse_qs and parse_qsl were moved to urlparse from cgi in python2.6
+  import cgi
+  parse_qs = cgi.parse_qs
+  parse_qsl = cgi.parse_qsl
+
+try:
+  # RE2 matches in linear time, making title filters on huge feeds immune
+  # to patterns that make the backtracking re engine blow up. Optional.
+  import re2
+except ImportError:
+  re2 = None
 
 # Renamed here to reduce verbosity in other sections
 safe_encode = googlecl.safe_encode
@@ -26,6 +45,9 @@ safe_decode = googlecl.safe_decode
 
 LOG = logging.getLogger(__name__)
 HTTP_ERROR_CODES_TO_RETRY_ON = [302, 500, 503]
+# Number of simultaneous requests when deleting lists of entries. Bulk
+# deletes are bound by server round-trip time, not local compute.
+MAX_DELETE_THREADS = 8
 
 
 class Error(Exception):
@@ -84,6 +106,11 @@ class BaseCL(object):
                                             'retry_delay',
                                             default=0,
                                             option_type=float)
+    # Compiled title patterns, keyed by pattern string. Scripts that call
+    # get_entries repeatedly with a rotating set of filters recompile the
+    # same patterns otherwise, and heavy embedding applications can churn
+    # re's global cache out from under us.
+    self._title_pattern_cache = {}
 
     try:
       service_name = self.auth_service
@@ -107,6 +134,9 @@ class BaseCL(object):
     if prompt:
       prompt_message = ('Are you SURE you want to delete %s "%s"? (y/N): ' %
                         (entry_type, '%s'))
+    # Collect all of the user's answers up front, so the actual deletes can
+    # be issued several at a time -- they are dominated by round-trip time.
+    items_to_delete = []
     for item in entries:
       if prompt:
         delete_str = raw_input(prompt_message % safe_encode(item.title.text))
@@ -117,19 +147,58 @@ class BaseCL(object):
       else:
         delete = True
       if delete:
-        try:
-          if callback:
-            # if callback is provided then deletion is done by calling it
-            callback(item)
+        items_to_delete.append(item)
+
+    def delete_item(item):
+      try:
+        if callback:
+          # if callback is provided then deletion is done by calling it
+          callback(item)
+        else:
+          # Later versions are defined with lowercase function names.
+          # These versions take GDataEntry objects, older takes the edit link.
+          if hasattr(self, 'delete'):
+            self.delete(item)
           else:
-            # Later versions are defined with lowercase function names.
-            # These versions take GDataEntry objects, older takes the edit link.
-            if hasattr(self, 'delete'):
-              self.delete(item)
-            else:
-              self.Delete(item.GetEditLink().href)
-        except self.request_error, err:
-          LOG.warning('Could not delete ' + entry_type + ': ' + str(err))
+            self.Delete(item.GetEditLink().href)
+      except self.request_error, err:
+        LOG.warning('Could not delete ' + entry_type + ': ' + str(err))
+
+    if len(items_to_delete) <= 1:
+      for item in items_to_delete:
+        delete_item(item)
+      return
+    work_queue = Queue.Queue()
+    for item in items_to_delete:
+      work_queue.put(item)
+    # Unexpected exceptions (anything but request_error, which delete_item
+    # logs) are collected and re-raised in the caller after the workers
+    # finish, matching the serial loop's behavior.
+    errors = []
+
+    def worker():
+      while True:
+        if errors:
+          return
+        try:
+          item = work_queue.get_nowait()
+        except Queue.Empty:
+          return
+        try:
+          delete_item(item)
+        except Exception, err:
+          errors.append(err)
+
+    # Every worker issues the same operation, so the original_operation
+    # attribute shared through retry_delete is the same in all threads.
+    threads = [threading.Thread(target=worker)
+               for _ in xrange(min(MAX_DELETE_THREADS, len(items_to_delete)))]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    if errors:
+      raise errors[0]
 
   DeleteEntryList = delete_entry_list
 
@@ -152,14 +221,7 @@ class BaseCL(object):
     result_body = server_response.read()
 
     if server_response.status == 200:
-      try:
-        from urlparse import parse_qs
-        parse_func = parse_qs
-      except ImportError:
-        # parse_qs was moved to urlparse from cgi in python2.6
-        import cgi
-        parse_func = cgi.parse_qs
-      param_dict = parse_func(result_body)
+      param_dict = parse_qs(result_body)
       email = param_dict['email'][0]
     # This block copied (with some modification) from GDataService (2.0.10)
     elif server_response.status == 302:
@@ -204,8 +266,12 @@ class BaseCL(object):
     """
     # XXX: Should probably go through all code and make sure title can only be
     # NoneType or list, not also maybe a string.
+    page_size = None
     if self.max_results is not None:
-      uri = set_max_results(uri, self.max_results)
+      # The server ignores per-page values above 1000, so don't request
+      # more than it will return.
+      page_size = min(self.max_results, 1000)
+      uri = set_max_results(uri, page_size)
     if isinstance(uri, unicode):
       uri = uri.encode('utf-8')
     feed = None
@@ -233,46 +299,81 @@ class BaseCL(object):
         print "for more details:"
         print "http://code.google.com/p/googlecl/wiki/UploadingGoogleDocs\n\n"
       return []
-    all_entries = feed.entry
-    if feed.GetNextLink():
-      if self.cap_results:
-        LOG.warning('Leaving data that matches query on server.' +
-                    ' Increase max_results or set cap_results to False.')
-      else:
-        while feed and feed.GetNextLink():
-          feed = self.GetNext(feed)
-          if feed:
-            all_entries.extend(feed.entry)
+    # Build the title filter up front so each page can be matched as it
+    # arrives, instead of materializing every page before filtering.
     # Check if title is NoneType, empty string, empty list, or a single-item
     # list containing any of the prior.
     if not titles or (len(titles) == 1 and not titles[0]):
-      LOG.debug('Retrieved ' + str(len(all_entries)) +
-                ' entries, returning them all')
-      return all_entries
-
-    if self.use_regex:
+      match_title = None
+    elif self.use_regex:
       # Carefully build title regex.
       if isinstance(titles, basestring):
         title_regex = titles
       else:
         title_regex = safe_decode('|'.join(titles))
       LOG.debug(safe_encode('Using regex: ' + title_regex))
-      try:
-        entries = [entry for entry in all_entries
-                   if entry.title.text and
-                   re.match(title_regex, safe_decode(entry.title.text))]
-      except re.error, err:
-        LOG.error('Regular expression error: ' + str(err) + '!')
-        entries = []
+      pattern = self._title_pattern_cache.get(title_regex)
+      if pattern is None:
+        try:
+          # Compile once and use the bound match method, rather than paying
+          # for a trip through re's module-level cache on every entry.
+          pattern = compile_titles_regex(title_regex)
+        except re.error, err:
+          LOG.error('Regular expression error: ' + str(err) + '!')
+          return []
+        if len(self._title_pattern_cache) >= 128:
+          self._title_pattern_cache.clear()
+        self._title_pattern_cache[title_regex] = pattern
+      # Bind the match method once instead of re-fetching it per entry.
+      match = pattern.match
+      match_title = lambda text: text and match(safe_decode(text))
     else:
       if isinstance(titles, list):
         title_list = titles
       else:
         title_list = [titles]
-      entries = [entry for entry in all_entries
-                 if safe_decode(entry.title.text) in title_list]
-    LOG.debug('Retrieved ' + str(len(all_entries)) +
-              ' entries, returning ' + str(len(entries)) + ' of them')
+      match_title = lambda text: safe_decode(text) in title_list
+
+    if self.cap_results and feed.GetNextLink():
+      LOG.warning('Leaving data that matches query on server.' +
+                  ' Increase max_results or set cap_results to False.')
+    entries = []
+    num_retrieved = 0
+    while feed:
+      # Request the next page on a thread so the server round-trip overlaps
+      # with filtering the page already in hand. Unmatched entries are
+      # dropped page by page instead of being held until the end.
+      fetch_result = []
+      fetcher = None
+      if not self.cap_results and feed.GetNextLink():
+        def fetch_next(current_feed=feed):
+          try:
+            fetch_result.append(self.GetNext(current_feed))
+          except Exception, err:
+            fetch_result.append(err)
+        fetcher = threading.Thread(target=fetch_next)
+        fetcher.start()
+      num_retrieved += len(feed.entry)
+      if match_title is None:
+        entries.extend(feed.entry)
+      else:
+        append_entry = entries.append
+        for entry in feed.entry:
+          if match_title(entry.title.text):
+            append_entry(entry)
+      if fetcher is None:
+        break
+      fetcher.join()
+      feed = fetch_result[0] if fetch_result else None
+      if isinstance(feed, Exception):
+        raise feed
+
+    if match_title is None:
+      LOG.debug('Retrieved ' + str(num_retrieved) +
+                ' entries, returning them all')
+    else:
+      LOG.debug('Retrieved ' + str(num_retrieved) +
+                ' entries, returning ' + str(len(entries)) + ' of them')
     return entries
 
   GetEntries = get_entries
@@ -312,11 +413,23 @@ class BaseCL(object):
       return entries[0]
     elif len(entries) > 1:
       print 'More than one match for title ' + (title or '')
-      for num, entry in enumerate(entries):
+      # Don't flood the terminal when a broad filter matches hundreds of
+      # entries -- list a screenful and let the user refine the title.
+      max_listed = 50
+      if len(entries) > max_listed:
+        print ('(showing %i of %i matches; give a more specific title'
+               ' to narrow the list)' % (max_listed, len(entries)))
+      num_listed = min(len(entries), max_listed)
+      for num, entry in enumerate(entries[:num_listed]):
         print '%i) %s' % (num, safe_decode(entry.title.text))
       selection = -1
-      while selection < 0 or selection > len(entries)-1:
-        selection = int(raw_input('Please select one of the items by number: '))
+      while selection < 0 or selection > num_listed-1:
+        try:
+          selection = int(raw_input('Please select one of the items by '
+                                    'number: '))
+        except ValueError:
+          # Non-numeric input shouldn't toss out the list of candidates.
+          selection = -1
       return entries[selection]
 
   GetSingleEntry = get_single_entry
@@ -401,16 +514,46 @@ class BaseCL(object):
     raise err
 
 
+def compile_titles_regex(title_regex):
+  """Compile a title-matching regex, preferring RE2 when installed.
+
+  Patterns RE2 does not support (e.g. backreferences) silently fall back
+  to the standard re module.
+  """
+  if re2 is not None:
+    try:
+      return re2.compile(title_regex)
+    except re.error:
+      pass
+  return re.compile(title_regex)
+
+
+# Cache of rewritten uris, keyed by (uri, max). is_token_valid and repeated
+# feed fetches pass identical uris, so remember the answer instead of
+# re-parsing the query string every call.
+_max_results_uri_cache = {}
+
+
 def set_max_results(uri, max):
   """Set max-results parameter if it is not set already."""
-  max_str = str(max)
-  if uri.find('?') == -1:
-    return uri + '?max-results=' + max_str
+  try:
+    return _max_results_uri_cache[(uri, max)]
+  except KeyError:
+    pass
+  scheme, netloc, path, params, query, fragment = urlparse.urlparse(uri)
+  query_params = parse_qsl(query, keep_blank_values=True)
+  # Only looking at actual parameter names avoids false positives on uris
+  # with 'max-results' somewhere in the path.
+  if any(key == 'max-results' for key, _ in query_params):
+    new_uri = uri
   else:
-    if uri.find('max-results') == -1:
-      return uri + '&max-results=' + max_str
-    else:
-      return uri
+    query_params.append(('max-results', str(max)))
+    new_uri = urlparse.urlunparse((scheme, netloc, path, params,
+                                   urllib.urlencode(query_params), fragment))
+  if len(_max_results_uri_cache) >= 256:
+    _max_results_uri_cache.clear()
+  _max_results_uri_cache[(uri, max)] = new_uri
+  return new_uri
 
 
 # The use of login_required has been deprecated - all tasks now require
@@ -449,23 +592,40 @@ class Task(object):
     self.run = callback or self._not_impl
     self.required = required
     self.optional = optional
+    # Precompute the set forms used by option validation, so each check is
+    # a membership test instead of rebuilding sets from the nested lists.
+    self._required_items = [(req, set(req) if isinstance(req, list) else None)
+                            for req in required]
+    self._optional_set = set(optional)
     self.login_required = login_required
-    # Take the "required" list, join all the terms by the following rules:
-    # 1) if the term is a string, leave it.
-    # 2) if the term is a list, join it with the ' OR ' string.
-    # Then join the resulting list with ' AND '.
-    if self.required:
-      req_str = ' AND '.join(['('+' OR '.join(a)+')' if isinstance(a, list) \
-                              else a for a in self.required])
-    else:
-      req_str = 'none'
-    if self.optional:
-      opt_str = ' Optional: ' + str(self.optional)[1:-1].replace("'", '')
-    else:
-      opt_str = ''
-    if args_desc:
-      args_desc = ' Arguments: ' + args_desc
-    self.usage = 'Requires: ' + req_str + opt_str + args_desc
+    # The usage string is only shown for the task the user actually runs
+    # (or asks help for), so defer building it until it is read.
+    self._args_desc = args_desc
+    self._usage = None
+
+  @property
+  def usage(self):
+    """Human-readable requirements, built on first access."""
+    if self._usage is None:
+      # Take the "required" list, join all the terms by the following rules:
+      # 1) if the term is a string, leave it.
+      # 2) if the term is a list, join it with the ' OR ' string.
+      # Then join the resulting list with ' AND '.
+      if self.required:
+        req_str = ' AND '.join(['('+' OR '.join(a)+')' if isinstance(a, list) \
+                                else a for a in self.required])
+      else:
+        req_str = 'none'
+      if self.optional:
+        opt_str = ' Optional: ' + str(self.optional)[1:-1].replace("'", '')
+      else:
+        opt_str = ''
+      if self._args_desc:
+        args_desc = ' Arguments: ' + self._args_desc
+      else:
+        args_desc = ''
+      self._usage = 'Requires: ' + req_str + opt_str + args_desc
+    return self._usage
 
   def get_outstanding_requirements(self, options):
     """Return a list of required options that are missing.
@@ -487,9 +647,8 @@ class Task(object):
                               if not attr.startswith('_') and
                               getattr(options, attr) is None)
     missing_requirements = []
-    for requirement in self.required:
-      if isinstance(requirement, list):
-        sub_req_set = set(requirement)
+    for requirement, sub_req_set in self._required_items:
+      if sub_req_set is not None:
         # If every element in sub_req_set is in missing_options_set,
         # add the first element of the requirements list to the missing
         # requirements.
@@ -504,9 +663,7 @@ class Task(object):
   def is_optional(self, attribute):
     """See if an attribute is optional"""
     # No list of lists in the optional fields
-    if attribute in self.optional:
-      return True
-    return False
+    return attribute in self._optional_set
 
   def _not_impl(self, *args):
     """Just use this as a place-holder for Task callbacks."""
@@ -537,6 +694,8 @@ class BaseEntryToStringWrapper(object):
     self.intra_property_delimiter = intra_property_delimiter
     self.label_delimiter = label_delimiter
     self.default_url_field = default_url_field
+    # Filled in on first use; GetHtmlLink scans the entry's link list.
+    self._html_link = None
 
   @property
   def debug(self):
@@ -565,29 +724,31 @@ class BaseEntryToStringWrapper(object):
     return self._url('site')
 
   def _url(self, subfield):
-    if not self.entry.GetHtmlLink():
+    entry = self.entry
+    if self._html_link is None:
+      self._html_link = entry.GetHtmlLink()
+    if self._html_link is None:
       href = ''
     else:
-      href = self.entry.GetHtmlLink().href
+      href = self._html_link.href
 
     if subfield == 'direct':
-      return self.entry.content.src or href
-    return href or self.entry.content.src
+      return entry.content.src or href
+    return href or entry.content.src
 
   @property
   def summary(self):
     """Summary or description."""
-    try:
-      # Try to access the "default" description
-      value = self.entry.media.description.text
-    except AttributeError:
-      # If it's not there, try the summary attribute
-      value = self.entry.summary.text
-    else:
-      if not value:
-        # If the "default" description was there, but it was empty,
-        # try the summary attribute.
-        value = self.entry.summary.text
+    entry = self.entry
+    # Prefer the "default" description. Probing with getattr skips the
+    # raise/catch cost of an AttributeError for entry types without it.
+    media = getattr(entry, 'media', None)
+    description = getattr(media, 'description', None)
+    value = getattr(description, 'text', None)
+    if not value:
+      # The "default" description is missing or empty, so use the summary
+      # attribute.
+      value = entry.summary.text
     return value
   description = summary
 
@@ -608,7 +769,10 @@ class BaseEntryToStringWrapper(object):
       return None
 
     if scheme_or_label:
-      return scheme_or_label[scheme_or_label.find('#')+1:]
+      # partition finds the '#' and splits in one pass; without one, the
+      # whole string is the label.
+      _, sep, label = scheme_or_label.partition('#')
+      return label if sep else scheme_or_label
     else:
       return None
 
@@ -645,14 +809,16 @@ class BaseEntryToStringWrapper(object):
                                                  if text_extractor(e)])
     else:
       separating_string = self.intra_property_delimiter + ' '
-      joined_string = ''
+      # Accumulate in a list and join once -- repeated += on a string
+      # copies the whole intermediate result every iteration.
+      parts = []
       for entry in entry_list:
-        if self.label_delimiter is not None:
-          label = self._extract_label(entry, label_attr=label_attribute)
-          if label:
-            joined_string += label + self.label_delimiter
-        joined_string += text_extractor(entry) + separating_string
-      return joined_string.rstrip(separating_string)
+        text = text_extractor(entry)
+        label = self._extract_label(entry, label_attr=label_attribute)
+        if label:
+          text = label + self.label_delimiter + text
+        parts.append(text)
+      return separating_string.join(parts)
 
 
 def compile_entry_string(wrapped_entry, attribute_list, delimiter,
@@ -670,7 +836,7 @@ def compile_entry_string(wrapped_entry, attribute_list, delimiter,
     newline_replacer: String to replace newlines with. Default ' '. Set to
                       NoneType to leave newlines in place.
   """
-  return_string = ''
+  parts = []
   if not delimiter:
     delimiter = ','
   if delimiter.strip() == ',':
@@ -698,19 +864,24 @@ def compile_entry_string(wrapped_entry, attribute_list, delimiter,
     # Ensure the delimiter won't appear in a non-delineation role,
     # but let it slide if the raw xml is being dumped
     if attr != 'xml':
-      return_string += val.replace(delimiter, ' ') + delimiter
+      parts.append(val.replace(delimiter, ' ').replace('\n', newline_replacer))
     else:
-      return_string = val
-    # Don't do processing if attribute is xml
-    if attr != 'xml':
-      return_string = return_string.replace('\n', newline_replacer)
+      # Don't do processing if attribute is xml
+      parts = [val]
 
-  return_string = return_string.rstrip(delimiter)
+  # Joining once avoids quadratic string copies, and doesn't need the old
+  # rstrip(delimiter) (which stripped any trailing characters in that set,
+  # not just the literal delimiter).
+  return_string = delimiter.join(parts)
   return_string = return_string.encode(googlecl.TERMINAL_ENCODING,
                                        'backslashreplace')
   return return_string
 
 
+# Tags are separated by commas, with any surrounding whitespace ignored.
+_TAG_SEPARATOR_RE = re.compile(r'\s*,\s*')
+
+
 def generate_tag_sets(tags):
   """Generate sets of tags based on a string.
 
@@ -728,21 +899,18 @@ def generate_tag_sets(tags):
       add_set: set object of the tags to add
       replace_tags: boolean indicating if all the old tags are removed
   """
-  tags = tags.replace(', ', ',')
-  tagset = set(tags.split(','))
-  remove_set = set(tag[1:] for tag in tagset if tag[0] == '-')
-  if '-' in remove_set:
-    replace_tags = True
-  else:
-    replace_tags = False
+  remove_set = set()
   add_set = set()
-  if len(remove_set) != len(tagset):
-    # TODO: Can do this more cleanly with regular expressions?
-    for tag in tagset:
+  for tag in _TAG_SEPARATOR_RE.split(tags.strip()):
+    if not tag:
+      continue
+    if tag.startswith('\\-'):
       # Remove the escape '\' for calculation of 'add' set
-      if tag[:1] == '\-':
-        add_set.add(tag[1:])
+      add_set.add(tag[1:])
+    elif tag.startswith('-'):
       # Don't add the tags that are being removed
-      elif tag[0] != '-':
-        add_set.add(tag)
+      remove_set.add(tag[1:])
+    else:
+      add_set.add(tag)
+  replace_tags = '-' in remove_set
   return (remove_set, add_set, replace_tags)
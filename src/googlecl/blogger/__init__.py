@@ -86,10 +86,11 @@ def _run_list(client, options, args):
   titles_list = googlecl.build_titles_list(options.title, args)
   entries = client.GetPosts(options.blog, titles_list,
                             user_id=options.owner or 'default')
+  fields = options.fields.split(',')
   for entry in entries:
     print googlecl.base.compile_entry_string(
                                              BloggerEntryToStringWrapper(entry),
-                                             options.fields.split(','),
+                                             fields,
                                              delimiter=options.delimiter)
 
 
@@ -275,6 +275,7 @@ def _list(client, options, args):
   titles_list = googlecl.build_titles_list(options.title, args)
   parser = DateRangeParser()
   date_range = parser.parse(options.date)
+  fields = options.fields.split(',')
   for cal in cal_user_list:
     print ''
     print safe_encode('[' + unicode(cal) + ']')
@@ -288,7 +289,7 @@ def _list(client, options, args):
     for entry in single_events:
       print googlecl.base.compile_entry_string(
                             CalendarEntryToStringWrapper(entry, client.config),
-                            options.fields.split(','),
+                            fields,
                             delimiter=options.delimiter)
 
 
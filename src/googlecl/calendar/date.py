@@ -42,7 +42,7 @@ ACCEPTED_TIME_FORMATS = ['%I%p',
                          '%H:%M']
 # Regular expression for strings that specify a time that could be afternoon or
 # morning. First group will be the hour, second the minutes.
-AMBIGUOUS_TIME_REGEX = '((?:1[0-2])|(?:[1-9]))?(?::([0-9]{2}))?$'
+AMBIGUOUS_TIME_REGEX = re.compile('((?:1[0-2])|(?:[1-9]))?(?::([0-9]{2}))?$')
 
 _DAY_TIME_TOKENIZERS = ['@', ' at ']
 _RANGE_TOKENIZERS = [',']
@@ -104,7 +104,7 @@ def parse_ambiguous_time(time_token):
   Returns:
     Tuple of (hour, minute). The hour is still not on a 24 hour clock.
   """
-  ambiguous_time = re.match(AMBIGUOUS_TIME_REGEX, time_token)
+  ambiguous_time = AMBIGUOUS_TIME_REGEX.match(time_token)
   if not ambiguous_time:
     return None, None
 
@@ -21,6 +21,8 @@ import gdata.client
 import googlecl
 import googlecl.base
 import logging
+import time
+import urllib
 
 LOG = logging.getLogger(__name__)
 
@@ -74,8 +76,6 @@ class BaseClientCL(googlecl.base.BaseCL):
       True if access token was succesfully retrieved and set, otherwise False.
 
     """
-    import urllib
-    import time
     # XXX: Not sure if get_oauth_token() will accept a list of mixed strings and
     # atom.http_core.Uri objects...
     if not scopes:
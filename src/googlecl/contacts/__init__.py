@@ -142,10 +142,11 @@ class ContactsEntryToStringWrapper(googlecl.base.BaseEntryToStringWrapper):
 def _run_list(client, options, args):
   titles_list = googlecl.build_titles_list(options.title, args)
   entries = client.GetContacts(titles_list)
+  fields = options.fields.split(',')
   for entry in entries:
     print googlecl.base.compile_entry_string(
                                             ContactsEntryToStringWrapper(entry),
-                                            options.fields.split(','),
+                                            fields,
                                             delimiter=options.delimiter)
 
 
@@ -146,10 +146,11 @@ def _run_list(client, options, args):
   titles_list = googlecl.build_titles_list(options.title, args)
   folder_entries = client.get_folder(options.folder)
   entries = client.get_doclist(titles_list, folder_entries)
+  fields = options.fields.split(',')
   for entry in entries:
     print googlecl.base.compile_entry_string(
                                googlecl.base.BaseEntryToStringWrapper(entry),
-                               options.fields.split(','),
+                               fields,
                                delimiter=options.delimiter)
 
 
@@ -43,7 +43,6 @@ def _map_access_string(access_string, default_value='private'):
   try:
     return access_string_mappings[access_string]
   except KeyError:
-    import re
     if access_string.find('link') != -1:
       return 'private'
   return default_value
@@ -227,9 +226,10 @@ def _run_list(client, options, args):
                                     query=options.query,
                                     force_photos=True,
                                     photo_title=options.photo)
+  fields = options.fields.split(',')
   for entry in entries:
     print googlecl.base.compile_entry_string(PhotoEntryToStringWrapper(entry),
-                                             options.fields.split(','),
+                                             fields,
                                              delimiter=options.delimiter)
 
 
@@ -238,9 +238,10 @@ def _run_list_albums(client, options, args):
   entries = client.build_entry_list(user=options.owner or options.user,
                                     titles=titles_list,
                                     force_photos=False)
+  fields = options.fields.split(',')
   for entry in entries:
     print googlecl.base.compile_entry_string(AlbumEntryToStringWrapper(entry),
-                                             options.fields.split(','),
+                                             fields,
                                              delimiter=options.delimiter)
 
 
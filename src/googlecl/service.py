@@ -100,11 +100,11 @@ class BaseServiceCL(googlecl.base.BaseCL):
     # Need to do this detection/conversion here so we can add the 'email' API
     if not scopes:
       scopes = gdata.service.lookup_scopes(self.service)
-    if isinstance(scopes, tuple):
+    if isinstance(scopes, (list, tuple)):
       scopes = list(scopes)
-    if not isinstance(scopes, list):
-      scopes = [scopes,]
-    scopes.extend(['https://www.googleapis.com/auth/userinfo#email'])
+    else:
+      scopes = [scopes]
+    scopes.append('https://www.googleapis.com/auth/userinfo#email')
     LOG.debug('Scopes being requested: ' + str(scopes))
 
     try:
@@ -68,10 +68,11 @@ def _run_sites(client, options, args):
       options.fields.count('site_name')):
     options.fields = options.fields.replace('page_name', 'site_name', 1)
   sites = client.GetSiteFeed()
+  fields = options.fields.split(',')
   for entry in sites.entry:
     print googlecl.base.compile_entry_string(
         googlecl.base.BaseEntryToStringWrapper(entry),
-        options.fields.split(','),
+        fields,
         delimiter=options.delimiter)
 
 def _run_list(client, options, args):
@@ -113,11 +114,12 @@ def _run_list(client, options, args):
   LOG.info('uri=%s' % uri)
   feed = client.GetContentFeed(uri=uri)
 
+  fields = options.fields.split(',')
   for entry in feed.entry:
     #print 'entry=%s' % entry
     print googlecl.base.compile_entry_string(
         googlecl.base.BaseEntryToStringWrapper(entry),
-        options.fields.split(','),
+        fields,
         delimiter=options.delimiter)
 
 def _run_upload(client, options, args):
@@ -18,6 +18,8 @@ import re
 service_name = __name__.split('.')[-1]
 LOGGER_NAME = __name__
 SECTION_HEADER = service_name.upper()
+# Pulls the rejection reason out of a video entry's raw xml.
+_REASON_REGEX = re.compile(r'<ns1:control .*? name="(\w+)" reasonCode="(\w+)"')
 
 
 class VideoEntryToStringWrapper(googlecl.base.BaseEntryToStringWrapper):
@@ -52,8 +54,7 @@ class VideoEntryToStringWrapper(googlecl.base.BaseEntryToStringWrapper):
       # Apparently the structure for video entries isn't fully fleshed out,
       # so use a regex on the xml.
       xml_string = self.xml
-      reason_regex = r'<ns1:control .*? name="(\w+)" reasonCode="(\w+)"'
-      match = re.search(reason_regex, xml_string)
+      match = _REASON_REGEX.search(xml_string)
       if match:
         return '%s (%s)' % (match.group(1), match.group(2))
     if self.entry.media.private:
@@ -89,9 +90,10 @@ def _run_list(client, options, args):
   titles_list = googlecl.build_titles_list(options.title, args)
   entries = client.GetVideos(user=options.owner or 'default',
                              titles=titles_list)
+  fields = options.fields.split(',')
   for vid in entries:
     print googlecl.base.compile_entry_string(VideoEntryToStringWrapper(vid),
-                                             options.fields.split(','),
+                                             fields,
                                              delimiter=options.delimiter)
 
 